@@ -1,19 +1,36 @@
 import os
+import argparse
+import cProfile
+import glob
+import hashlib
+import numpy as np
 import pandas as pd
 import pulp
 import logging
+import multiprocessing
+from multiprocessing import shared_memory
 import traceback
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import messagebox, filedialog
 from tkcalendar import DateEntry
 import sys
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; the NumPy implementation is used without it
+    njit = None
+    prange = range
+
 
 # Constants for better readability
 DATE_FORMAT = "%d-%m-%Y"
 DEMAND_CONVERSION_FACTOR = 1000 * 0.25  # For MW to kWh conversion
+NUM_BLOCKS = 96
+BLOCK_COLUMNS = list(range(1, NUM_BLOCKS + 1))
+EXCEL_ENGINE = "calamine"  # Rust-based reader, much faster than openpyxl
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for both development and PyInstaller packaged apps """
@@ -34,7 +51,11 @@ GENERATOR_HISTORICAL_DATA_DIR = resource_path("generator_data/")
 MUST_RUN_TYPE = "Must run"
 AVAILABLE_TYPE = "Available"
 OUTPUT_DIR = resource_path("output")
+CACHE_DIR = resource_path(".cache")
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
 NUM_WORKERS = 8
+LOG_FORMAT = '%(asctime)s - %(message)s'
+USE_LP_SOLVER = False  # Fall back to the PuLP/HiGHS model instead of the greedy fill
 
 # Create a timestamped log file
 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -43,70 +64,138 @@ LOG_FILE = os.path.join("logs", f'power_optimization_log_{timestamp}.txt')
 # Ensure necessary directories exist
 os.makedirs("logs", exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Worker processes re-import this module; they get their log file and data from their initializer.
+# Workers of the frozen executable re-run this script with --multiprocessing-fork.
+IS_MAIN_PROCESS = multiprocessing.current_process().name == "MainProcess" and "--multiprocessing-fork" not in sys.argv
 
 # Initialize logging with the timestamped log file
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
-                    format='%(asctime)s - %(message)s', filemode='w')
+if IS_MAIN_PROCESS:
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format=LOG_FORMAT, filemode='w')
 logger = logging.getLogger()
 
+# Send a worker process's log records to the main process's log file
+def init_worker_logging(log_file):
+    logging.basicConfig(filename=log_file, level=logging.INFO, format=LOG_FORMAT, filemode='a')
+
 # Helper function to validate file existence
 def validate_file_exists(filepath):
     if not os.path.exists(filepath):
         logger.error(f"File not found: {filepath}")
         raise FileNotFoundError(f"File not found: {filepath}")
 
-# Preload all generator data into memory
-def preload_generator_data():
-    generator_data = {}
-    for filename in os.listdir(GENERATOR_HISTORICAL_DATA_DIR):
-        if filename.endswith(".xlsx"):
-            generator_code = filename.replace(".xlsx", "")
-            file_path = os.path.join(GENERATOR_HISTORICAL_DATA_DIR, filename)
-            df = pd.read_excel(file_path)
+# Parquet cache file for an Excel file, keyed on its path and modification time
+def excel_cache_path(file_path):
+    path_key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{path_key}_{os.stat(file_path).st_mtime_ns}.parquet")
 
-            if 'Date' not in df.columns:
-                logger.error(f"Date column missing in file: {filename}")
-                continue  # Skip this file
+# Read an Excel file through its parquet cache
+def read_excel_cached(file_path):
+    cache_path = excel_cache_path(file_path)
 
-            df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT, errors='coerce')
-            generator_data[generator_code] = df
+    if os.path.exists(cache_path):
+        df = pd.read_parquet(cache_path)
+    else:
+        df = pd.read_excel(file_path, engine=EXCEL_ENGINE)
+        try:
+            # Escape the prefix: the install directory may contain glob characters such as [ ]
+            for stale_path in glob.glob(glob.escape(cache_path.rsplit("_", 1)[0]) + "_*.parquet"):
+                os.remove(stale_path)
+            # Parquet needs string column names; block numbers are restored to int below
+            df.rename(columns=str).to_parquet(cache_path + ".tmp", index=False)
+            os.replace(cache_path + ".tmp", cache_path)
+        except Exception as e:
+            logger.warning(f"Could not cache {file_path}: {e}")
+
+    # Block columns are always int from here on, so lookups use the block number directly
+    return df.rename(columns=lambda c: int(c) if str(c).isdigit() else c)
+
+# Read one generator file indexed by Date, or None if it has no Date column
+def read_generator_file(filename):
+    df = read_excel_cached(os.path.join(GENERATOR_HISTORICAL_DATA_DIR, filename))
+    if 'Date' not in df.columns:
+        return None
+
+    df['Date'] = pd.to_datetime(df['Date'], format=DATE_FORMAT, errors='coerce')
+    return index_by_date(df)
 
-    return generator_data
+# Preload all generator data into memory as a (generator, date, block) tensor
+def preload_generator_data():
+    filenames = [filename for filename in os.listdir(GENERATOR_HISTORICAL_DATA_DIR) if filename.endswith(".xlsx")]
 
-# Preload grid cost, Open Access, and Bank data into memory
+    # Parse workbooks without a parquet cache entry in parallel; cached ones load quickly in-process
+    uncached = [filename for filename in filenames
+                if not os.path.exists(excel_cache_path(os.path.join(GENERATOR_HISTORICAL_DATA_DIR, filename)))]
+    frames = {}
+    workers = min(NUM_WORKERS, os.cpu_count() or 1, len(uncached))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_logging, initargs=(LOG_FILE,)) as executor:
+            frames.update(zip(uncached, executor.map(read_generator_file, uncached)))
+
+    generator_data = {}
+    for filename in filenames:
+        df = frames[filename] if filename in frames else read_generator_file(filename)
+        if df is None:
+            logger.error(f"Date column missing in file: {filename}")
+            continue  # Skip this file
+
+        generator_data[filename.replace(".xlsx", "")] = df
+
+    all_dates = pd.DatetimeIndex([])
+    for df in generator_data.values():
+        all_dates = all_dates.union(df.index)
+
+    # Missing dates or blocks are left as NaN. Stored as float32 (MW values carry far fewer
+    # than 7 significant digits); sums over generators are accumulated in float64.
+    # gen_has_date records which (generator, date) rows exist in the generator's own file.
+    gen_tensor = np.empty((len(generator_data), len(all_dates), NUM_BLOCKS), dtype=np.float32)
+    gen_has_date = np.zeros((len(generator_data), len(all_dates)), dtype=bool)
+    for i, df in enumerate(generator_data.values()):
+        gen_has_date[i] = all_dates.isin(df.index)
+        gen_tensor[i] = df.reindex(index=all_dates, columns=BLOCK_COLUMNS).to_numpy(dtype=np.float32)
+
+    gen_index = {code: i for i, code in enumerate(generator_data)}
+    date_index = {date: i for i, date in enumerate(all_dates)}
+    return gen_tensor, gen_has_date, gen_index, date_index
+
+# Index a sheet by its Date column (sorted), keeping the first row for each date
+def index_by_date(df):
+    return df.dropna(subset=['Date']).drop_duplicates(subset='Date').set_index('Date').sort_index()
+
+# Preload grid cost, Open Access, and Bank data into memory, indexed by Date
 def preload_additional_data():
     validate_file_exists(GRID_COST_FILE)
     validate_file_exists(OA_FILE)
     validate_file_exists(BANK_FILE)
 
-    df_grid_cost = pd.read_excel(GRID_COST_FILE)
+    df_grid_cost = read_excel_cached(GRID_COST_FILE)
     df_grid_cost['Date'] = pd.to_datetime(df_grid_cost['Date'], format=DATE_FORMAT, errors='coerce')
 
-    df_oa = pd.read_excel(OA_FILE)
+    df_oa = read_excel_cached(OA_FILE)
     df_oa['Date'] = pd.to_datetime(df_oa['Date'], format=DATE_FORMAT, errors='coerce')
 
-    df_bank = pd.read_excel(BANK_FILE)
+    df_bank = read_excel_cached(BANK_FILE)
     df_bank['Date'] = pd.to_datetime(df_bank['Date'], format=DATE_FORMAT, errors='coerce')
 
-    return df_grid_cost, df_oa, df_bank
+    return index_by_date(df_grid_cost), index_by_date(df_oa), index_by_date(df_bank)
 
 # Validate generator data
 def validate_generator_data(df):
-    if df[['available_power', 'variable_cost']].isnull().values.any():
-        missing_values = df[df[['available_power', 'variable_cost']].isnull()]
+    missing = df[['available_power', 'variable_cost']].isna().any(axis=1)
+    if missing.any():
         logger.error("Missing values in the 'available_power' or 'variable_cost' columns.")
-        logger.error(missing_values)
+        logger.error(df[missing])
         raise ValueError("Invalid generator data. Check the log file for details.")
 
 # Adjust demand with Open Access
 def adjust_demand_with_open_access(date, block, demand_mw, df_oa):
-    row = df_oa[df_oa['Date'] == pd.to_datetime(date)]
-    if row.empty:
+    if date not in df_oa.index:
         return demand_mw * DEMAND_CONVERSION_FACTOR, 0  # Convert MW to kWh, OA = 0
-    block_column = block if block in row.columns else str(block)
-    if block_column not in row.columns:
+    row = df_oa.loc[date]
+    oa_value_mw = row.get(block)
+    if oa_value_mw is None:
         return demand_mw * DEMAND_CONVERSION_FACTOR, 0  # Convert MW to kWh, OA = 0
-    oa_value_mw = row[block_column].values[0]
     adjusted_demand_mw = demand_mw - oa_value_mw
     adjusted_demand_kwh = adjusted_demand_mw * DEMAND_CONVERSION_FACTOR  # Convert MW to kWh
     logger.info(f"Adjusted demand after Open Access for {date} Block {block}: {adjusted_demand_kwh} kWh")
@@ -114,13 +203,12 @@ def adjust_demand_with_open_access(date, block, demand_mw, df_oa):
 
 # Adjust demand with Banked energy
 def adjust_demand_with_bank(date, block, demand_kwh, df_bank):
-    row = df_bank[df_bank['Date'] == pd.to_datetime(date)]
-    if row.empty:
+    if date not in df_bank.index:
         return demand_kwh, 0
-    block_column = block if block in row.columns else str(block)
-    if block_column not in row.columns:
+    row = df_bank.loc[date]
+    bank_value_mw = row.get(block)
+    if bank_value_mw is None:
         return demand_kwh, 0
-    bank_value_mw = row[block_column].values[0]
     bank_value_kwh = bank_value_mw * DEMAND_CONVERSION_FACTOR  # Convert MW to kWh
     adjusted_demand = demand_kwh + bank_value_kwh
     logger.info(f"Adjusted demand after Bank for {date} Block {block}: {adjusted_demand} kWh (Bank adjustment: {bank_value_kwh} kWh)")
@@ -128,34 +216,70 @@ def adjust_demand_with_bank(date, block, demand_kwh, df_bank):
 
 # Load grid cost for the given block
 def load_grid_cost(date, block, df_grid_cost):
-    row = df_grid_cost[df_grid_cost['Date'] == pd.to_datetime(date)]
-    if row.empty:
+    if date not in df_grid_cost.index:
         raise ValueError(f"No grid cost data found for date {date}")
-    block_column = block if block in row.columns else str(block)
-    
-    if block_column not in row.columns:
-        raise ValueError(f"No grid cost data found for block {block} on date {date}")
-    
-    return row[block_column].values[0]
+    row = df_grid_cost.loc[date]
+    grid_cost = row.get(block)
 
-def setup_optimization_problem(available_generators):
-    prob = pulp.LpProblem("Maximize_Generator_Use", pulp.LpMaximize)
-    gen_power_vars = {}
-    for _, g in available_generators.iterrows():
-        gen_power_vars[g["name"]] = pulp.LpVariable(g["name"], lowBound=0, upBound=0)
+    if grid_cost is None:
+        raise ValueError(f"No grid cost data found for block {block} on date {date}")
 
-    # Specify the path to the local CBC solver
-    solver_path = resource_path("solvers/cbc.exe")
-    pulp.LpSolverDefault = pulp.COIN_CMD(path=solver_path)
+    return grid_cost
 
-    return prob, gen_power_vars
+# Create the LP solver; HiGHS runs in-process through highspy, with no subprocess or LP file
+def create_lp_solver():
+    return pulp.HiGHS(msg=False, timeLimit=5)
 
-# Preload generator and grid data
-preloaded_generators = preload_generator_data()
-df_grid_cost, df_oa, df_bank = preload_additional_data()
+# Build the LP model once; each block only updates the generator bounds and the demand RHS
+def build_lp_model(available_generators):
+    prob = pulp.LpProblem("Maximize_Generator_Use", pulp.LpMaximize)
+    gen_power_vars = {}
+    for name in available_generators['name']:
+        gen_power_vars[name] = pulp.LpVariable(name, lowBound=0, upBound=0)
+
+    total_power = pulp.lpSum(gen_power_vars.values())
+    prob.setObjective(total_power)
+    prob += (total_power <= 0, "Demand")
+
+    return prob, gen_power_vars, prob.constraints["Demand"], create_lp_solver()
+
+# Generator and grid data, set by run_normal in the main process and by init_worker in workers
+gen_tensor = gen_has_date = gen_index = date_index = None
+df_grid_cost = df_oa = df_bank = None
+lp_model = df_generators = None  # Set once per worker process by init_worker
+gen_tensor_shm = None  # Worker's handle on the shared generator tensor, kept open for the view
+
+# Preload generator and grid data once, on the first run, so the UI opens without waiting
+# for it. This is never done at import time: the loader's process pool pickles functions
+# of this module, which blocks while the module is still importing.
+@lru_cache(maxsize=1)
+def load_data():
+    return (*preload_generator_data(), *preload_additional_data())
+
+# Copy the generator tensor into a shared memory block so workers map it instead of each
+# unpickling their own copy. The caller closes and unlinks the block when the pool is done.
+def share_generator_tensor():
+    shm = shared_memory.SharedMemory(create=True, size=max(gen_tensor.nbytes, 1))
+    np.ndarray(gen_tensor.shape, dtype=gen_tensor.dtype, buffer=shm.buf)[:] = gen_tensor
+    return shm
+
+# Set up a worker process with the main process's log file, preloaded data and LP model.
+# The generator tensor is a read-only view on the main process's shared memory block; workers
+# only look up single blocks in it and never build the precomputed (date, block) tensors.
+def init_worker(log_file, tensor_shm_name, tensor_shape, tensor_dtype, generator_has_date, generator_index, generator_date_index,
+                grid_cost, oa, bank, generators):
+    global gen_tensor, gen_has_date, gen_index, date_index, df_grid_cost, df_oa, df_bank, lp_model, df_generators, gen_tensor_shm
+    init_worker_logging(log_file)
+    gen_tensor_shm = shared_memory.SharedMemory(name=tensor_shm_name)
+    gen_tensor = np.ndarray(tensor_shape, dtype=tensor_dtype, buffer=gen_tensor_shm.buf)
+    gen_tensor.flags.writeable = False
+    gen_has_date, gen_index, date_index = generator_has_date, generator_index, generator_date_index
+    df_grid_cost, df_oa, df_bank = grid_cost, oa, bank
+    df_generators = generators
+    lp_model = build_lp_model(generators[generators['Type of Plant'] == AVAILABLE_TYPE])
 
 # Optimization function for demand fulfillment
-def optimize_power_for_demand(demand_kwh, date, block, generators, prob, gen_power_vars):
+def optimize_power_for_demand(demand_kwh, date, block, generators):
     must_run_power, must_run_cost, must_run_details = calculate_must_run_power(generators, date, block)
 
     # Adjust demand after must-run generators
@@ -176,10 +300,11 @@ def optimize_power_for_demand(demand_kwh, date, block, generators, prob, gen_pow
     total_cost = must_run_cost
     exchange_quantity = 0
     available_gen_demand_met = 0
+    available_gen_details = ""
 
     if remaining_demand > 0:
         available_gen_demand_met, available_gen_cost, available_gen_details = optimize_available_generators(
-            remaining_demand, date, block, generators, prob, gen_power_vars
+            remaining_demand, date, block, generators
         )
         total_cost += available_gen_cost
         logger.info(f"Available Generator Demand Met: {available_gen_demand_met} kWh, Cost: {available_gen_cost} INR")
@@ -205,44 +330,142 @@ def optimize_power_for_demand(demand_kwh, date, block, generators, prob, gen_pow
         "Available Generator Details": available_gen_details
     }
 
+# Format the per-generator "Code | kWh | INR" lines for the output file
+def format_generator_details(codes, power_kwh, variable_costs):
+    return "\n".join([f"{code} | {power:.2f} kWh | {power * vc:.2f} INR"
+                      for code, power, vc in zip(codes, power_kwh, variable_costs)])
+
+# Look up generator output (kWh) for one block; generators without a historical data file get 0.
+# A generator whose file has no row for the date is an error, so the block is skipped.
+def lookup_generator_power(codes, date, block):
+    rows = np.array([gen_index.get(code, -1) for code in codes], dtype=int)
+    has_data = rows >= 0
+    missing_date = ~gen_has_date[rows[has_data], date_index[date]]
+    if missing_date.any():
+        missing_codes = np.asarray(codes)[has_data][missing_date]
+        raise ValueError(f"No generator data found for {', '.join(map(str, missing_codes))} on date {date}")
+    power_kwh = np.zeros(len(rows), dtype=gen_tensor.dtype)
+    power_kwh[has_data] = gen_tensor[rows[has_data], date_index[date], block - 1] * DEMAND_CONVERSION_FACTOR  # Convert MW to kWh
+    return power_kwh, has_data
+
+# Must-run generators with historical data, and all available generators, in file order
+def split_generators(generators):
+    must_run_generators = generators[(generators['Type of Plant'] == MUST_RUN_TYPE) & generators['Code'].isin(list(gen_index))]
+    available_generators = generators[generators['Type of Plant'] == AVAILABLE_TYPE]
+    return must_run_generators, available_generators
+
+# Must-run power and cost (date, block) and available capacity (generator, date, block) in kWh
+# over the whole generator history, computed once per generator set
+@lru_cache(maxsize=1)
+def precompute_generator_tensors(must_run_codes, must_run_variable_costs, available_codes):
+    must_run_rows = np.array([gen_index[code] for code in must_run_codes], dtype=int)
+    must_run_tensor = gen_tensor[must_run_rows]
+    must_run_power = must_run_tensor.sum(axis=0, dtype=np.float64) * DEMAND_CONVERSION_FACTOR
+    must_run_cost = np.einsum('gdb,g->db', must_run_tensor, np.array(must_run_variable_costs, dtype=float)) * DEMAND_CONVERSION_FACTOR
+
+    available_rows = np.array([gen_index.get(code, -1) for code in available_codes], dtype=int)
+    has_data = available_rows >= 0
+    available_caps = np.zeros((len(available_rows),) + gen_tensor.shape[1:], dtype=gen_tensor.dtype)
+    available_caps[has_data] = np.nan_to_num(gen_tensor[available_rows[has_data]]) * DEMAND_CONVERSION_FACTOR
+
+    return must_run_power, must_run_cost, available_caps
+
+# Precomputed tensors for this generator set (the generator file is re-read on every run).
+# Called once per run by run_normal for the vectorized path, never per block.
+def generator_tensors(generators):
+    must_run_generators, available_generators = split_generators(generators)
+    return precompute_generator_tensors(tuple(must_run_generators['Code']),
+                                        tuple(must_run_generators['variable_cost'].astype(float)),
+                                        tuple(available_generators['Code']))
+
 # Calculate must-run power (preload generator data)
 def calculate_must_run_power(generators, date, block):
-    must_run_power = 0
-    must_run_cost = 0
-    must_run_details = []
-
-    for _, g in generators[generators['Type of Plant'] == MUST_RUN_TYPE].iterrows():
-        generator_code = g["Code"]
-        generator_data = preloaded_generators.get(generator_code)
-        if generator_data is not None:
-            power_mw = generator_data.loc[generator_data['Date'] == date, block].values[0]
-            power_kwh = power_mw * DEMAND_CONVERSION_FACTOR  # Convert MW to kWh
-            must_run_power += power_kwh
-            must_run_cost += power_kwh * g['variable_cost']
-            must_run_details.append(f"{generator_code} | {power_kwh} kWh | {power_kwh * g['variable_cost']:.2f} INR")
-
-    return must_run_power, must_run_cost, "\n".join(must_run_details)
-
-# Optimize available generators (maximize their use)
-def optimize_available_generators(remaining_demand, date, block, generators, prob, gen_power_vars):
+    must_run_generators = generators[generators['Type of Plant'] == MUST_RUN_TYPE]
+    power_kwh, has_data = lookup_generator_power(must_run_generators['Code'], date, block)
+    variable_costs = must_run_generators['variable_cost'].to_numpy(dtype=float)
+
+    must_run_power = power_kwh[has_data].sum(dtype=np.float64)
+    must_run_cost = (power_kwh * variable_costs)[has_data].sum()
+    must_run_details = format_generator_details(must_run_generators['Code'].to_numpy()[has_data], power_kwh[has_data], variable_costs[has_data])
+
+    return must_run_power, must_run_cost, must_run_details
+
+# Fill generator capacity in merit order (cheapest first) up to the remaining demand.
+# caps has generators on axis 0; remaining_demand broadcasts against the other axes.
+def fill_available_capacity(caps, variable_costs, remaining_demand):
+    order = np.argsort(variable_costs, kind="stable")
+    sorted_caps = caps[order]
+    filled_before = np.cumsum(sorted_caps, axis=0, dtype=np.float64) - sorted_caps
+    used_sorted = np.clip(remaining_demand - filled_before, 0, sorted_caps)
+
+    used = np.empty_like(used_sorted)
+    used[order] = used_sorted
+    return used
+
+# Merit-order fill over (generator, date, block) capacities already sorted by variable cost,
+# accumulating the used kWh and cost per block in the same pass
+def fill_sorted_capacity_loop(sorted_caps, sorted_costs, remaining_demand):
+    n_generators, n_dates, n_blocks = sorted_caps.shape
+    used = np.zeros_like(sorted_caps)
+    power = np.zeros((n_dates, n_blocks))
+    cost = np.zeros((n_dates, n_blocks))
+
+    for d in prange(n_dates):
+        for b in range(n_blocks):
+            left = remaining_demand[d, b]
+            for g in range(n_generators):
+                if left <= 0:
+                    break
+                take = min(sorted_caps[g, d, b], left)
+                used[g, d, b] = take
+                power[d, b] += take
+                cost[d, b] += take * sorted_costs[g]
+                left -= take
+
+    return used, power, cost
+
+fill_sorted_capacity_jit = None
+if njit is not None:
+    try:
+        fill_sorted_capacity_jit = njit(cache=True, parallel=True)(fill_sorted_capacity_loop)
+    except RuntimeError:  # No on-disk cache location, e.g. when running from the frozen executable
+        fill_sorted_capacity_jit = njit(parallel=True)(fill_sorted_capacity_loop)
+
+# Fill (generator, date, block) capacities in merit order and return the used kWh with its
+# per-block total and cost, using the compiled loop when Numba is installed
+def dispatch_available_capacity(caps, variable_costs, remaining_demand):
+    if fill_sorted_capacity_jit is None:
+        used = fill_available_capacity(caps, variable_costs, remaining_demand)
+        return used, used.sum(axis=0, dtype=np.float64), np.einsum('gdb,g->db', used, variable_costs)
+
+    order = np.argsort(variable_costs, kind="stable")
+    used_sorted, power, cost = fill_sorted_capacity_jit(np.ascontiguousarray(caps[order]), variable_costs[order],
+                                                        np.ascontiguousarray(remaining_demand, dtype=np.float64))
+    used = np.empty_like(used_sorted)
+    used[order] = used_sorted
+    return used, power, cost
+
+# Optimize available generators (maximize their use) with the LP model. Only the per-block
+# USE_LP_SOLVER path comes here; the default greedy fill is done in optimize_blocks_vectorized.
+def optimize_available_generators(remaining_demand, date, block, generators):
     available_generators = generators[generators['Type of Plant'] == AVAILABLE_TYPE]
-    for _, g in available_generators.iterrows():
-        generator_code = g["Code"]
-        generator_data = preloaded_generators.get(generator_code)
-        if generator_data is not None:
-            power_mw = generator_data.loc[generator_data['Date'] == date, block].values[0]
-            power_kwh = power_mw * DEMAND_CONVERSION_FACTOR  # Convert MW to kWh
-            gen_power_vars[g["name"]].upBound = power_kwh
-
-    prob.setObjective(pulp.lpSum(gen_power_vars[g['name']] for _, g in available_generators.iterrows()))
-    prob += pulp.lpSum(gen_power_vars[g['name']] for _, g in available_generators.iterrows()) <= remaining_demand
-    prob.solve()
+    caps, _ = lookup_generator_power(available_generators['Code'], date, block)
+    caps = np.nan_to_num(caps)
+    prob, gen_power_vars, demand_constraint, solver = lp_model or build_lp_model(available_generators)
+    names = available_generators['name'].to_numpy()
+    codes = available_generators['Code'].to_numpy()
+    variable_costs = available_generators['variable_cost'].to_numpy(dtype=float)
+
+    for name, power_kwh in zip(names, caps):
+        gen_power_vars[name].upBound = float(power_kwh)
+
+    demand_constraint.changeRHS(remaining_demand)
+    prob.solve(solver)
 
     if pulp.LpStatus[prob.status] == "Optimal":
-        available_gen_demand_met = sum(gen_power_vars[g["name"]].varValue for _, g in available_generators.iterrows())
-        available_gen_cost = sum(gen_power_vars[g["name"]].varValue * g["variable_cost"] for _, g in available_generators.iterrows())
-        available_gen_details = [f"{g['Code']} | {gen_power_vars[g['name']].varValue:.2f} kWh | {gen_power_vars[g['name']].varValue * g['variable_cost']:.2f} INR" for _, g in available_generators.iterrows()]
-        return available_gen_demand_met, available_gen_cost, "\n".join(available_gen_details)
+        used = np.array([gen_power_vars[name].varValue for name in names], dtype=float)
+        available_gen_details = format_generator_details(codes, used, variable_costs)
+        return used.sum(), (used * variable_costs).sum(), available_gen_details
     else:
         logger.error("No feasible solution found for available generators.")
         return 0, 0, ""
@@ -255,9 +478,7 @@ def process_block(demand, date, block, df_generators):
 
         logger.info(f"Starting optimization for demand after adjustments: {demand_after_bank} kWh on {date} Block {block}")
 
-        prob, gen_power_vars = setup_optimization_problem(df_generators)
-
-        result = optimize_power_for_demand(demand_after_bank, date, block, df_generators, prob, gen_power_vars)
+        result = optimize_power_for_demand(demand_after_bank, date, block, df_generators)
         result["OA Used (MW)"] = oa_value_mw
         result["Bank Adjustment (MW)"] = bank_value_mw
         return result
@@ -265,13 +486,141 @@ def process_block(demand, date, block, df_generators):
         logger.error(f"Error processing block {block} on {date}: {traceback.format_exc()}")
         return None
 
-# Main function with parallel execution
-def run_normal(start_date_str, end_date_str, start_block, end_block):
+# Optimize one date's blocks in a worker process, with the generators set by init_worker
+def process_date_blocks(date, blocks, demands_mw):
+    results = [process_block(demand_mw, date, block, df_generators) for block, demand_mw in zip(blocks, demands_mw)]
+    return [result for result in results if result]
+
+# Run the per-block optimization in worker processes (used with the LP solver), one task per date
+def process_blocks_parallel(df_filtered, start_block, end_block, df_generators):
+    results = []
+    futures = []
+
+    tensor_shm = share_generator_tensor()
+    try:
+        with ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=init_worker,
+                                 initargs=(LOG_FILE, tensor_shm.name, gen_tensor.shape, gen_tensor.dtype.str, gen_has_date, gen_index, date_index,
+                                           df_grid_cost, df_oa, df_bank, df_generators)) as executor:
+            blocks = list(range(start_block, end_block + 1))
+            for date, demands_mw in zip(df_filtered["Date"], df_filtered[blocks].to_numpy()):
+                futures.append(executor.submit(process_date_blocks, date, blocks, demands_mw))
+
+            for future in as_completed(futures):
+                results.extend(future.result())
+    finally:
+        tensor_shm.close()
+        tensor_shm.unlink()
+
+    return pd.DataFrame(results)
+
+# Align a date-indexed block sheet (OA, Bank, grid cost) to the requested dates and blocks
+def pivot_blocks(df, dates, blocks, fill_value=np.nan):
+    return df.reindex(index=dates, columns=blocks, fill_value=fill_value).to_numpy(dtype=float)
+
+# Optimize every (date, block) pair at once on (n_dates, n_blocks) arrays
+def optimize_blocks_vectorized(df_filtered, start_block, end_block, generators, tensors):
+    blocks = list(range(start_block, end_block + 1))
+
+    has_generator_data = df_filtered['Date'].isin(list(date_index))
+    for date in df_filtered.loc[~has_generator_data, 'Date']:
+        logger.error(f"No generator data found for date {date}")
+    df_filtered = df_filtered[has_generator_data]
+
+    dates = pd.DatetimeIndex(df_filtered['Date'])
+    date_cols = np.array([date_index[date] for date in dates], dtype=int)
+    block_cols = np.array(blocks, dtype=int) - 1
+
+    # Demand after Open Access and Bank adjustments, in kWh
+    demand_mw = df_filtered[blocks].to_numpy(dtype=float)
+    oa_mw = pivot_blocks(df_oa, dates, blocks, fill_value=0)
+    bank_mw = pivot_blocks(df_bank, dates, blocks, fill_value=0)
+    grid_rate = pivot_blocks(df_grid_cost, dates, blocks)
+    demand_kwh = (demand_mw - oa_mw) * DEMAND_CONVERSION_FACTOR + bank_mw * DEMAND_CONVERSION_FACTOR
+
+    # Must-run totals and available capacities come from the precomputed history tensors
+    must_run_generators, available_generators = split_generators(generators)
+    must_run_power_all, must_run_cost_all, available_caps = tensors
+    must_run_power = must_run_power_all[np.ix_(date_cols, block_cols)]
+    must_run_cost = must_run_cost_all[np.ix_(date_cols, block_cols)]
+
+    # Per-generator must-run output, shape (generator, date, block), for the details column
+    must_run_rows = np.array([gen_index[code] for code in must_run_generators['Code']], dtype=int)
+    must_run_vc = must_run_generators['variable_cost'].to_numpy(dtype=float)
+    must_run_kwh = gen_tensor[np.ix_(must_run_rows, date_cols, block_cols)] * DEMAND_CONVERSION_FACTOR
+
+    # Dates where a selected generator's file has no row, shape (generator, date)
+    selected_codes = np.concatenate([must_run_generators['Code'].to_numpy(), available_generators['Code'].to_numpy()])
+    selected_codes = selected_codes[[code in gen_index for code in selected_codes]]
+    selected_rows = np.array([gen_index[code] for code in selected_codes], dtype=int)
+    missing_history = ~gen_has_date[np.ix_(selected_rows, date_cols)]
+    missing_date = missing_history.any(axis=0)
+
+    remaining_demand = demand_kwh - must_run_power
+
+    # Available generators, filled in merit order up to the remaining demand
+    available_vc = available_generators['variable_cost'].to_numpy(dtype=float)
+    available_kwh, available_power, available_cost = dispatch_available_capacity(
+        available_caps[:, date_cols[:, None], block_cols], available_vc, np.nan_to_num(np.maximum(remaining_demand, 0)))
+
+    # Whatever the generators cannot cover is bought from the exchange
+    exchange_quantity = np.where(remaining_demand > 0, np.maximum(remaining_demand - available_power, 0), 0)
+    total_cost = must_run_cost + available_cost + exchange_quantity * grid_rate
+
+    for d in np.flatnonzero(missing_date):
+        logger.error(f"No generator data found for {', '.join(map(str, selected_codes[missing_history[:, d]]))} on date {dates[d]}")
+    for d, b in np.argwhere(remaining_demand < 0):
+        logger.error(f"Invalid remaining demand: {remaining_demand[d, b]} kWh on {dates[d]} Block {blocks[b]}")
+    for d, b in np.argwhere(np.isnan(grid_rate)):
+        logger.error(f"No grid cost data found for block {blocks[b]} on date {dates[d]}")
+
+    valid = ~(remaining_demand < 0) & ~np.isnan(grid_rate) & ~missing_date[:, None]
+    d_idx, b_idx = np.nonzero(valid)
+    must_run_codes = must_run_generators['Code'].to_numpy()
+    available_codes = available_generators['Code'].to_numpy()
+
+    return pd.DataFrame({
+        "Date": dates[d_idx],
+        "Block": np.array(blocks)[b_idx],
+        "Demand": demand_kwh[valid],
+        "Total Demand Met": demand_kwh[valid],
+        "Must-Run Generators Used (kWh)": must_run_power[valid],
+        "Available Generators Used (kWh)": available_power[valid],
+        "Grid Consumption (kWh)": exchange_quantity[valid],
+        "Total Cost": total_cost[valid],
+        "Grid Rate (INR/kWh)": grid_rate[valid],
+        "OA Used (MW)": oa_mw[valid],
+        "Bank Adjustment (MW)": bank_mw[valid],
+        "Must-Run Generator Details": [
+            format_generator_details(must_run_codes, must_run_kwh[:, d, b], must_run_vc)
+            for d, b in zip(d_idx, b_idx)
+        ],
+        "Available Generator Details": [
+            format_generator_details(available_codes, available_kwh[:, d, b], available_vc) if remaining_demand[d, b] > 0 else ""
+            for d, b in zip(d_idx, b_idx)
+        ],
+    })
+
+# Save the results in the requested format and return the file path
+def save_results(df_results, output_file_base, output_format):
+    output_file_path = f"{output_file_base}.{output_format}"
+    if output_format == "parquet":
+        df_results.to_parquet(output_file_path, index=False)
+    elif output_format == "csv":
+        df_results.to_csv(output_file_path, index=False)
+    else:
+        df_results.to_excel(output_file_path, index=False, engine="xlsxwriter")
+    return output_file_path
+
+# Main function to run the optimization over a date and block range
+def run_normal(start_date_str, end_date_str, start_block, end_block, output_format="xlsx"):
+    global gen_tensor, gen_has_date, gen_index, date_index, df_grid_cost, df_oa, df_bank
+    gen_tensor, gen_has_date, gen_index, date_index, df_grid_cost, df_oa, df_bank = load_data()
+
     validate_file_exists(DEMAND_FILE)
     validate_file_exists(GENERATOR_FILE)
 
-    df_demand = pd.read_excel(DEMAND_FILE)
-    df_generators = pd.read_excel(GENERATOR_FILE)
+    df_demand = read_excel_cached(DEMAND_FILE)
+    df_generators = read_excel_cached(GENERATOR_FILE)
     validate_generator_data(df_generators)
 
     start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
@@ -279,23 +628,12 @@ def run_normal(start_date_str, end_date_str, start_block, end_block):
 
     df_filtered = df_demand[(df_demand['Date'] >= start_date) & (df_demand['Date'] <= end_date)]
 
-    results = []
-    futures = []
-
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        for idx, row in df_filtered.iterrows():
-            date = row["Date"]
-            for block in range(start_block, end_block + 1):
-                demand_mw = row[block]
-                futures.append(executor.submit(process_block, demand_mw, date, block, df_generators))
-
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                results.append(result)
-
-    # Convert results into a DataFrame and structure as per the required output
-    df_results = pd.DataFrame(results)
+    # Collect results into a DataFrame and structure as per the required output
+    if USE_LP_SOLVER:
+        df_results = process_blocks_parallel(df_filtered, start_block, end_block, df_generators)
+    else:
+        tensors = generator_tensors(df_generators)
+        df_results = optimize_blocks_vectorized(df_filtered, start_block, end_block, df_generators, tensors)
 
     # Calculate new columns based on the results
     df_results['Net Demand (kWh)'] = df_results['Demand'] - df_results['OA Used (MW)'] * DEMAND_CONVERSION_FACTOR + df_results['Bank Adjustment (MW)'] * DEMAND_CONVERSION_FACTOR
@@ -310,24 +648,33 @@ def run_normal(start_date_str, end_date_str, start_block, end_block):
         "Grid Consumption (kWh)", "Grid Rate (INR/kWh)", "Total Cost"
     ]]
 
-    # Save the results to Excel in the output directory
-    output_file_path = os.path.join(OUTPUT_DIR, f"power_optimization_results_ui_{start_date_str}_to_{end_date_str}_block_{start_block}_to_{end_block}.xlsx")
-    df_results.to_excel(output_file_path, index=False)
+    # Save the results in the output directory
+    output_file_base = os.path.join(OUTPUT_DIR, f"power_optimization_results_ui_{start_date_str}_to_{end_date_str}_block_{start_block}_to_{end_block}")
+    output_file_path = save_results(df_results, output_file_base, output_format)
 
     logger.info(f"Results saved to {output_file_path}")
 
-# Custom run function for a custom date and block range
-def custom_run(start_date, end_date, start_block, end_block):
-    run_normal(start_date, end_date, start_block, end_block)
+# Custom run function for a custom date and block range. With profile set, the run is
+# recorded with cProfile and the stats are saved next to the results.
+def custom_run(start_date, end_date, start_block, end_block, output_format="xlsx", profile=False):
+    if not profile:
+        run_normal(start_date, end_date, start_block, end_block, output_format)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.runcall(run_normal, start_date, end_date, start_block, end_block, output_format)
+    profile_file_path = os.path.join(OUTPUT_DIR, f"profile_{start_date}_to_{end_date}_block_{start_block}_to_{end_block}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof")
+    profiler.dump_stats(profile_file_path)
+    logger.info(f"Profile saved to {profile_file_path}")
 
 # Tkinter UI for date and block range picker
-def run_ui():
+def run_ui(output_format="xlsx", profile=False):
     def run_custom():
         start_date = start_entry.get_date().strftime("%Y-%m-%d")
         end_date = end_entry.get_date().strftime("%Y-%m-%d")
         start_block = int(start_block_entry.get())
         end_block = int(end_block_entry.get())
-        custom_run(start_date, end_date, start_block, end_block)
+        custom_run(start_date, end_date, start_block, end_block, output_format, profile)
         messagebox.showinfo("Info", f"Custom run from {start_date} to {end_date}, Blocks {start_block} to {end_block} complete!")
 
     root = tk.Tk()
@@ -359,8 +706,17 @@ def run_ui():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Required for worker processes in the frozen executable
+
+    parser = argparse.ArgumentParser(description="Power Forecasting Optimization")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="xlsx",
+                        help="File format for the results (default: xlsx)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each run with cProfile and save a .prof file in the output folder")
+    args = parser.parse_args()
+
     try:
-        run_ui()
+        run_ui(args.output_format, args.profile)
     except Exception as e:
         logger.critical(f"Unhandled exception: {traceback.format_exc()}")
         messagebox.showerror("Fatal Error", f"An unexpected error occurred: {e}")
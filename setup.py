@@ -3,7 +3,6 @@ import os
 
 # List of additional files to be included
 include_files = [
-    ("solve rs/cbc.exe", "solvers/cbc.exe"),
     ("Demand.xlsx", "Demand.xlsx"),
     ("generator_mod.xlsx", "generator_mod.xlsx"),
     ("Rate.xlsx", "Rate.xlsx"),
@@ -14,7 +13,7 @@ include_files = [
 ]
 
 # Packages to include
-packages = ["pandas", "numpy", "tkinter", "tkcalendar", "pulp", "babel.numbers"]
+packages = ["pandas", "numpy", "tkinter", "tkcalendar", "pulp", "babel.numbers", "pyarrow", "python_calamine", "highspy", "xlsxwriter"]
 
 # Setup configuration for cx_Freeze
 setup(